@@ -3,21 +3,50 @@
 
 import os
 import re
+import struct
 import ctypes
 import ctypes.wintypes as wintypes
 import tkinter as tk
 from tkinter import ttk, messagebox
+import tkinter.font as tkfont
 import threading
+import queue
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+from collections import OrderedDict, deque
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor
 import string
 from datetime import datetime
 
+try:
+    from PIL import Image, ImageDraw, ImageTk
+except ImportError:  # Pillow is optional: fall back to one canvas item per rectangle
+    Image = ImageDraw = ImageTk = None
+
 DEBUG_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'treemap_debug.log')
 
 # Treemap layout: merge entries below this share of view root into "Other"
 OTHER_SIZE_PCT = 0.02
+# ...and entries below this share of their parent folder, plus the long tail
+# past (100 - OTHER_PARENT_PCT)% of the folder's size
+OTHER_PARENT_PCT = 0.5
 # Minimum estimated rectangle side (px) needed to show a label
 MIN_LABEL_WIDTH = 50
 MIN_LABEL_HEIGHT = 22
+# Rectangles below this size (px) are not drawn; children projected smaller
+# than MIN_RECT_AREA are merged into "Other" instead of getting their own tile
+MIN_RECT_SIDE = 2
+MIN_RECT_AREA = 4
+# Units used by format_size, each 1024x the previous
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+# Treemap layouts kept for quick depth/view switching
+LAYOUT_CACHE_SIZE = 8
+# Сканируем на полную глубину (100 уровней)
+SCAN_MAX_DEPTH = 100
+# Threads walking top-level folders in parallel (scan is I/O bound)
+SCAN_THREADS = (os.cpu_count() or 1) * 2
 
 # --- Constants (from original script) ---
 GENERIC_READ = 0x80000000
@@ -28,6 +57,15 @@ FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
 FILE_FLAG_OPEN_REPARSE_POINT = 0x00200000
 FSCTL_GET_REPARSE_POINT = 0x000900A8
 FILE_ATTRIBUTE_REPARSE_POINT = 0x400
+FILE_ATTRIBUTE_DIRECTORY = 0x10
+FILE_LIST_DIRECTORY = 0x0001
+FILE_SHARE_DELETE = 4
+FILE_ID_BOTH_DIRECTORY_INFO = 10
+FILE_ID_BOTH_DIRECTORY_RESTART_INFO = 11
+ERROR_NO_MORE_FILES = 18
+IO_REPARSE_TAG_SYMLINK = 0xA000000C
+IO_REPARSE_TAG_NAME_SURROGATE = 0x20000000
+DIR_INFO_BUFFER_SIZE = 64 * 1024
 MAX_REPARSE_SIZE = 16 * 1024
 INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
 INVALID_FILE_ATTRIBUTES = 0xFFFFFFFF
@@ -38,7 +76,12 @@ CreateFileW = kernel32.CreateFileW
 DeviceIoControl = kernel32.DeviceIoControl
 CloseHandle = kernel32.CloseHandle
 GetFileAttributesW = kernel32.GetFileAttributesW
+GetFileInformationByHandleEx = kernel32.GetFileInformationByHandleEx
+GetVolumeNameForVolumeMountPointW = kernel32.GetVolumeNameForVolumeMountPointW
 CreateFileW.restype = wintypes.HANDLE
+GetFileInformationByHandleEx.argtypes = [wintypes.HANDLE, ctypes.c_int,
+                                         ctypes.c_void_p, wintypes.DWORD]
+GetFileInformationByHandleEx.restype = wintypes.BOOL
 
 # --- Reparse buffer (simplified) ---
 class GENERIC_REPARSE_BUFFER(ctypes.Structure):
@@ -53,6 +96,81 @@ class GENERIC_REPARSE_BUFFER(ctypes.Structure):
         ("PathBuffer", ctypes.c_wchar * (MAX_REPARSE_SIZE // 2))
     ]
 
+# FILE_ID_BOTH_DIR_INFO header: NextEntryOffset, FileIndex, 4 timestamps (skipped),
+# EndOfFile, AllocationSize (skipped), FileAttributes, FileNameLength,
+# EaSize (holds the reparse tag for reparse points). FileName starts at byte 104.
+_DIR_INFO_HEAD = struct.Struct('<II32xq8xIII')
+_DIR_INFO_NAME_OFFSET = 104
+_DIR_INFO_BUF = threading.local()
+
+def _dir_info_buffer():
+    """This thread's reusable directory batch buffer and a byte view over it."""
+    buf = getattr(_DIR_INFO_BUF, 'buf', None)
+    if buf is None:
+        buf = _DIR_INFO_BUF.buf = ctypes.create_string_buffer(DIR_INFO_BUFFER_SIZE)
+        _DIR_INFO_BUF.view = memoryview(buf).cast('B')
+    return buf, _DIR_INFO_BUF.view
+
+def scandir_fast(path):
+    """Yield (name, attributes, size, reparse_tag) for each entry of a directory.
+
+    Reads whole batches of FILE_ID_BOTH_DIR_INFO records per syscall instead of
+    one FindNextFile call per entry. Raises OSError if the directory can't be read.
+    The batch buffer is shared per thread, so exhaust one listing before starting
+    another on the same thread.
+    """
+    h = CreateFileW(path, FILE_LIST_DIRECTORY,
+                    FILE_SHARE_READ | FILE_SHARE_WRITE | FILE_SHARE_DELETE,
+                    None, OPEN_EXISTING, FILE_FLAG_BACKUP_SEMANTICS, None)
+    if h == INVALID_HANDLE_VALUE or h is None:
+        raise ctypes.WinError()
+    try:
+        buf, view = _dir_info_buffer()
+        info_class = FILE_ID_BOTH_DIRECTORY_RESTART_INFO
+        while True:
+            if not GetFileInformationByHandleEx(h, info_class, buf, DIR_INFO_BUFFER_SIZE):
+                err = ctypes.GetLastError()
+                if err == ERROR_NO_MORE_FILES:
+                    return
+                raise ctypes.WinError(err)
+            info_class = FILE_ID_BOTH_DIRECTORY_INFO
+            off = 0
+            while True:
+                next_off, _, size, attrs, name_len, tag = _DIR_INFO_HEAD.unpack_from(buf, off)
+                name_start = off + _DIR_INFO_NAME_OFFSET
+                name = str(view[name_start:name_start + name_len], 'utf-16-le', 'surrogatepass')
+                if name != '.' and name != '..':
+                    yield name, attrs, size, (tag if attrs & FILE_ATTRIBUTE_REPARSE_POINT else 0)
+                if not next_off:
+                    break
+                off += next_off
+    finally:
+        CloseHandle(h)
+
+_PATH_BUFFER_OFFSET = GENERIC_REPARSE_BUFFER.PathBuffer.offset
+_DRIVE_RE = re.compile(r'([A-Z]:)')
+_VOLUME_RE = re.compile(r'VOLUME\{[0-9A-F-]+\}')
+_REPARSE_BUF = threading.local()
+_UNC_PREFIXES = ('UNC\\', '\\??\\UNC\\', '\\\\?\\UNC\\')
+
+def _reparse_buffer():
+    """This thread's reusable FSCTL_GET_REPARSE_POINT buffer and a zero-copy header view."""
+    buf = getattr(_REPARSE_BUF, 'buf', None)
+    if buf is None:
+        # Sized for the whole struct (header + PathBuffer), so the view stays inside it
+        buf = _REPARSE_BUF.buf = ctypes.create_string_buffer(
+            ctypes.sizeof(GENERIC_REPARSE_BUFFER))
+        _REPARSE_BUF.rdb = ctypes.cast(buf, ctypes.POINTER(GENERIC_REPARSE_BUFFER)).contents
+    return buf, _REPARSE_BUF.rdb
+
+def _get_volume_guid(root_path):
+    """Upper-cased 'VOLUME{GUID}' of the volume mounted at root_path (e.g. 'C:\\'), or None."""
+    buf = ctypes.create_unicode_buffer(50)
+    if not GetVolumeNameForVolumeMountPointW(root_path, buf, 50):
+        return None
+    m = _VOLUME_RE.search(buf.value.upper())
+    return m.group(0) if m else None
+
 # --- Helper functions (from original script) ---
 def _get_attrs(path):
     a = GetFileAttributesW(path)
@@ -64,8 +182,21 @@ def is_reparse_point(path):
     a = _get_attrs(path)
     return bool(a is not None and (a & FILE_ATTRIBUTE_REPARSE_POINT))
 
-def is_reparse_point_target_same_volume(path, volume_letter):
-    attrs = _get_attrs(path)
+def _targets_own_branch(path, target_rest):
+    """True if a same-volume target (target_rest: upper-cased, after its drive or
+    Volume{GUID} prefix) is the volume root, path itself or a folder above path.
+
+    Following such a junction walks the same subtree again until SCAN_MAX_DEPTH.
+    """
+    sub = target_rest.strip('\\')
+    if not sub:
+        return True
+    own = os.path.splitdrive(path)[1].strip('\\').upper()
+    return own == sub or own.startswith(sub + '\\')
+
+def is_reparse_point_target_same_volume(path, volume_letter, attrs=None, volume_guid=None):
+    if attrs is None:
+        attrs = _get_attrs(path)
     if attrs is None:
         return False
     if not (attrs & FILE_ATTRIBUTE_REPARSE_POINT):
@@ -77,7 +208,7 @@ def is_reparse_point_target_same_volume(path, volume_letter):
     if h == INVALID_HANDLE_VALUE or h is None:
         return False
 
-    buf = ctypes.create_string_buffer(MAX_REPARSE_SIZE)
+    buf, rdb = _reparse_buffer()
     bytes_returned = wintypes.DWORD(0)
     ok = DeviceIoControl(h, FSCTL_GET_REPARSE_POINT, None, 0, buf, 
                          MAX_REPARSE_SIZE, ctypes.byref(bytes_returned), None)
@@ -86,25 +217,33 @@ def is_reparse_point_target_same_volume(path, volume_letter):
         return False
 
     try:
-        rdb = GENERIC_REPARSE_BUFFER.from_buffer_copy(buf)
-        sub_off = rdb.SubstituteNameOffset // 2
-        sub_len = rdb.SubstituteNameLength // 2
-        target = "".join(rdb.PathBuffer[sub_off: sub_off + sub_len])
+        # Decode only the substitute name bytes, not the whole PathBuffer
+        start = _PATH_BUFFER_OFFSET + rdb.SubstituteNameOffset
+        length = rdb.SubstituteNameLength
+        if start + length > MAX_REPARSE_SIZE:
+            return False
+        target = ctypes.string_at(ctypes.addressof(buf) + start, length).decode('utf-16-le')
         target_upper = target.upper()
     except Exception:
         return False
 
     vol_upper = (volume_letter.rstrip(':').upper() + ':')
     
-    if r'UNC\\' in target_upper or r'\\??\\UNC\\' in target_upper or r'\\?\\UNC\\' in target_upper:
+    if target_upper.startswith(_UNC_PREFIXES):
         return False
     
-    m = re.search(r'([A-Z]:)', target_upper)
+    m = _DRIVE_RE.search(target_upper)
     if m:
-        return (m.group(1) == vol_upper)
+        if m.group(1) != vol_upper:
+            return False
+        return not _targets_own_branch(path, target_upper[m.end():])
     
     if 'VOLUME{' in target_upper:
-        return False
+        # Mount point given as \??\Volume{GUID}\: same volume only if the GUID matches
+        m = _VOLUME_RE.search(target_upper)
+        if not (m and volume_guid and m.group(0) == volume_guid):
+            return False
+        return not _targets_own_branch(path, target_upper[m.end():])
     
     return False
 
@@ -140,46 +279,123 @@ class CanvasTooltip:
             self.window = None
             self.label = None
 
+class RectIndex:
+    """Uniform grid over the canvas for point hit-testing of drawn rectangles."""
+
+    CELL = 32
+
+    def __init__(self):
+        self.cells = {}     # (col, row) -> [(node, x1, y1, x2, y2), ...] in draw order
+        self.count = 0
+
+    def clear(self):
+        self.cells.clear()
+        self.count = 0
+
+    def add(self, node, x1, y1, x2, y2):
+        entry = (node, x1, y1, x2, y2)
+        c = self.CELL
+        cells = self.cells
+        for col in range(x1 // c, x2 // c + 1):
+            for row in range(y1 // c, y2 // c + 1):
+                bucket = cells.get((col, row))
+                if bucket is None:
+                    cells[(col, row)] = [entry]
+                else:
+                    bucket.append(entry)
+        self.count += 1
+
+    def find(self, x, y):
+        """Topmost (last drawn) node whose rectangle contains (x, y)."""
+        bucket = self.cells.get((x // self.CELL, y // self.CELL))
+        if not bucket:
+            return None
+        for node, x1, y1, x2, y2 in reversed(bucket):
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                return node
+        return None
+
 # --- Node class (from original script) ---
 class Node:
+    # One instance per scanned file/folder: keep it dict-free. Drawing state
+    # lives in DiskSpaceVisualizer.label_fits, keyed by id(node).
+    __slots__ = ('name', 'parent', 'is_dir', 'children', 'size')
+    is_synthetic = False
+    is_other = False
+
     def __init__(self, name, parent=None, is_dir=False, size=0):
         self.name = name
         self.parent = parent
         self.is_dir = is_dir
         self.children = [] if is_dir else None
         self.size = size
-        # GUI-specific attributes
-        self.rect_coords = None  # (x1, y1, x2, y2)
-        self.canvas_id = None    # Canvas item ID
 
     def add_child(self, ch):
         if self.children is not None:
             self.children.append(ch)
 
     def full_path(self):
-        parts = []
+        parts = deque()
         node = self
         while node is not None:
-            parts.append(node.name)
+            parts.appendleft(node.name)
             node = node.parent
-        parts = list(reversed(parts))
-        if parts and parts[0].endswith(':'):
-            if len(parts) == 1:
-                return parts[0] + os.sep
-            return parts[0] + os.sep + os.path.join(*parts[1:])
+        if parts[0].endswith(':'):
+            drive = parts.popleft()
+            if not parts:
+                return drive + os.sep
+            return drive + os.sep + os.path.join(*parts)
         return os.path.join(*parts)
 
     def aggregate_size(self):
+        """Sum sizes bottom-up; iterative so deep trees don't hit the recursion limit.
+
+        Also drops empty children and sorts the rest by size desc, the order
+        the treemap layout needs, so drawing never has to filter or sort.
+        """
         if not self.is_dir:
             return self.size
-        total = 0
-        for ch in self.children:
-            total += ch.aggregate_size()
-        self.size = total
-        return total
+        stack = [(self, False)]     # (node, children already summed)
+        while stack:
+            node, ready = stack.pop()
+            if ready:
+                node.sort_children()
+                node.size = sum(ch.size for ch in node.children)
+            else:
+                stack.append((node, True))
+                stack.extend((ch, False) for ch in node.children if ch.is_dir)
+        return self.size
+
+    def sort_children(self):
+        """Drop empty children and order the rest by size, largest first."""
+        children = [ch for ch in self.children if ch.size > 0]
+        children.sort(key=lambda c: c.size, reverse=True)
+        self.children = children
+
+class OtherNode(Node):
+    """Synthetic treemap tile that groups small siblings."""
+    __slots__ = ('grouped_children', 'other_dir_count', 'other_file_count')
+    is_synthetic = True
+    is_other = True
+
+    def __init__(self, children):
+        super().__init__('Other', is_dir=True)
+        self.grouped_children = list(children)
+        self.size = sum(ch.size for ch in children)
+        self.other_dir_count = sum(1 for ch in children if ch.is_dir)
+        self.other_file_count = sum(1 for ch in children if not ch.is_dir)
 
 # --- Build tree function (from original script) ---
-def build_tree(path, parent=None, depth=0, max_depth=3, root_volume_letter=None):
+def build_tree(path, parent=None, depth=0, max_depth=3, root_volume_letter=None, is_dir=None,
+               root_volume_guid=None, reparse_checked=False):
+    """Scan path into a Node tree using an explicit stack (no recursion).
+
+    Names, sizes, attributes and reparse tags come from scandir_fast batches,
+    so each entry costs no extra GetFileAttributesW calls. Pass is_dir when the
+    caller already knows it (e.g. from a parent listing) to skip probing path,
+    and reparse_checked when that listing already accepted path as a folder
+    on the scanned volume.
+    """
     try:
         if parent is None:
             drive, _ = os.path.splitdrive(os.path.normpath(path))
@@ -187,45 +403,239 @@ def build_tree(path, parent=None, depth=0, max_depth=3, root_volume_letter=None)
             node = Node(root_name, parent=None, is_dir=True)
         else:
             node_name = os.path.basename(path) or path
-            node = Node(node_name, parent=parent, is_dir=os.path.isdir(path))
+            if is_dir is None:
+                is_dir = os.path.isdir(path)
+            node = Node(node_name, parent=parent, is_dir=is_dir)
 
-        if is_reparse_point(path):
-            same = is_reparse_point_target_same_volume(path, root_volume_letter)
+        if not reparse_checked and is_reparse_point(path):
+            same = is_reparse_point_target_same_volume(
+                path, root_volume_letter, volume_guid=root_volume_guid)
             if not same:
                 return None
 
-        if node.is_dir and depth < max_depth:
+        if not node.is_dir or depth >= max_depth:
+            return node
+
+        # (node, path, depth, parent to attach to once the directory opens)
+        stack = [(node, path, depth, None)]
+        while stack:
+            cur, cur_path, cur_depth, attach_to = stack.pop()
             try:
-                with os.scandir(path) as it:
-                    for entry in it:
-                        try:
-                            entry_path = entry.path
-                            if entry.is_dir(follow_symlinks=False):
-                                if is_reparse_point(entry_path):
-                                    same = is_reparse_point_target_same_volume(entry_path, root_volume_letter)
-                                    if not same:
-                                        continue
-                                child = build_tree(entry_path, parent=node, depth=depth+1, 
-                                                 max_depth=max_depth, root_volume_letter=root_volume_letter)
-                                if child:
-                                    node.add_child(child)
-                            else:
-                                try:
-                                    st = entry.stat(follow_symlinks=False)
-                                    size = st.st_size
-                                except Exception:
-                                    size = 0
-                                if size > 0:
-                                    child = Node(entry.name, parent=node, is_dir=False, size=size)
-                                    node.add_child(child)
-                        except PermissionError:
+                entries = list(scandir_fast(cur_path))
+            except OSError:
+                if attach_to is None:
+                    return None
+                continue
+            if attach_to is not None:
+                attach_to.add_child(cur)
+            for name, attrs, size, tag in entries:
+                # Directory symlinks are skipped like files (no size); junctions
+                # and other name surrogates must point at the scanned volume.
+                if attrs & FILE_ATTRIBUTE_DIRECTORY and tag != IO_REPARSE_TAG_SYMLINK:
+                    entry_path = os.path.join(cur_path, name)
+                    if tag & IO_REPARSE_TAG_NAME_SURROGATE:
+                        same = is_reparse_point_target_same_volume(
+                            entry_path, root_volume_letter, attrs, root_volume_guid)
+                        if not same:
                             continue
-            except PermissionError:
-                return None
+                    child = Node(name, parent=cur, is_dir=True)
+                    if cur_depth + 1 < max_depth:
+                        stack.append((child, entry_path, cur_depth + 1, cur))
+                    else:
+                        cur.add_child(child)
+                elif size > 0:
+                    cur.add_child(Node(name, parent=cur, is_dir=False, size=size))
         return node
     except Exception:
         return None
 
+def scan_drive(drive, max_depth, progress=None):
+    """Scan a drive: root files here, each top-level folder on a thread pool.
+
+    progress(finished, total) is called as top-level folders complete.
+    Returns the tree with sizes already aggregated, or None.
+    """
+    root_path = f"{drive}:\\"
+    root_vol = f"{drive}:"
+    root_guid = _get_volume_guid(root_path)
+    tree_root = build_tree(root_path, parent=None, depth=0,
+                           max_depth=1, root_volume_letter=root_vol,
+                           root_volume_guid=root_guid)
+    if not tree_root or max_depth <= 1:
+        if tree_root:
+            tree_root.aggregate_size()
+        return tree_root
+
+    subdirs = [ch for ch in tree_root.children if ch.is_dir]
+    tree_root.children = [ch for ch in tree_root.children if not ch.is_dir]
+    lock = threading.Lock()
+    total = len(subdirs)
+    done = [0]
+
+    def on_done(future):
+        child = future.result()
+        if child:
+            # Sum on the worker thread, overlapping other folders' disk I/O
+            child.aggregate_size()
+        with lock:
+            if child:
+                tree_root.add_child(child)
+            done[0] += 1
+            if progress:
+                progress(done[0], total)
+
+    with ThreadPoolExecutor(max_workers=SCAN_THREADS) as pool:
+        for ch in subdirs:
+            future = pool.submit(build_tree, os.path.join(root_path, ch.name),
+                                 parent=tree_root, depth=1, max_depth=max_depth,
+                                 root_volume_letter=root_vol, is_dir=True,
+                                 root_volume_guid=root_guid, reparse_checked=True)
+            future.add_done_callback(on_done)
+    # Subtrees are already summed: only the root level is left
+    tree_root.sort_children()
+    tree_root.size = sum(ch.size for ch in tree_root.children)
+    return tree_root
+
+# Shared memory layout: header (node count, names byte length), then
+# breadth-first arrays sizes (int64), name end offsets (int64), first child
+# index (int32), child count (int32), is_dir (int8), then the UTF-8 names
+# back to back with no separators
+_SHM_HEADER = struct.Struct('<qq')
+
+def pack_tree(root):
+    """Copy a tree into a new SharedMemory block (the caller closes it).
+
+    Nodes are stored in BFS order, so each folder's children are one contiguous
+    run: per node the block holds size, end offset of its UTF-8 name, index of
+    its first child, child count and is_dir, followed by all names.
+    """
+    nodes = [root]
+    first_child = array('i')
+    child_count = array('i')
+    i = 0
+    while i < len(nodes):
+        children = nodes[i].children
+        first_child.append(len(nodes))
+        if children:
+            child_count.append(len(children))
+            nodes.extend(children)
+        else:
+            child_count.append(0)
+        i += 1
+    sizes = array('q', [n.size for n in nodes])
+    dir_flags = array('b', [n.is_dir for n in nodes])
+    names = [n.name.encode('utf-8', 'surrogatepass') for n in nodes]
+    name_ends = array('q', accumulate(map(len, names)))
+    names = b''.join(names)
+
+    n = len(nodes)
+    shm = shared_memory.SharedMemory(
+        create=True, size=_SHM_HEADER.size + 25 * n + len(names))
+    buf = shm.buf
+    _SHM_HEADER.pack_into(buf, 0, n, len(names))
+    off = _SHM_HEADER.size
+    for part in (sizes, name_ends, first_child, child_count, dir_flags, names):
+        part = memoryview(part).cast('B')
+        buf[off:off + len(part)] = part
+        off += len(part)
+    return shm
+
+class SharedTree:
+    """Tree written by pack_tree, read in place from its SharedMemory block.
+
+    Only the root Node is created up front; a folder's children are built the
+    first time they are asked for, so attaching costs nothing however large the
+    scan was. The block stays open until close().
+    """
+
+    def __init__(self, shm):
+        self.shm = shm
+        buf = shm.buf
+        n, names_len = _SHM_HEADER.unpack_from(buf, 0)
+        off = _SHM_HEADER.size
+        self._views = []
+        for fmt, width in (('q', 8), ('q', 8), ('i', 4), ('i', 4), ('b', 1)):
+            self._views.append(buf[off:off + width * n].cast(fmt))
+            off += width * n
+        self._views.append(buf[off:off + names_len])
+        (self._sizes, self._name_ends, self._first_child,
+         self._child_count, self._dir_flags, self._names) = self._views
+        self.root = SharedNode(self, 0, None)
+
+    def node_fields(self, i):
+        """(name, is_dir, size) of node i."""
+        start = self._name_ends[i - 1] if i else 0
+        name = str(self._names[start:self._name_ends[i]], 'utf-8', 'surrogatepass')
+        return name, bool(self._dir_flags[i]), self._sizes[i]
+
+    def children_of(self, node):
+        if self.shm is None:
+            return []
+        first = self._first_child[node.index]
+        return [SharedNode(self, i, node)
+                for i in range(first, first + self._child_count[node.index])]
+
+    def close(self):
+        """Release the block; nodes not expanded by now stay childless."""
+        if self.shm is None:
+            return
+        # Views must be released before the block can be closed
+        for view in self._views:
+            view.release()
+        self._views = []
+        # Windows frees the block once the last handle closes; no unlink
+        self.shm.close()
+        self.shm = None
+
+class SharedNode(Node):
+    """Node of a SharedTree; its children are read from the block on first access."""
+    # The children property below shadows Node's slot; the list lives in _children
+    __slots__ = ('tree', 'index', '_children')
+
+    def __init__(self, tree, index, parent):
+        name, is_dir, size = tree.node_fields(index)
+        super().__init__(name, parent=parent, is_dir=is_dir, size=size)
+        self.tree = tree
+        self.index = index
+        self._children = None
+
+    @property
+    def children(self):
+        children = self._children
+        if children is None and self.is_dir:
+            children = self._children = self.tree.children_of(self)
+        return children
+
+    @children.setter
+    def children(self, value):
+        self._children = value
+
+def _scan_entrypoint(drive, max_depth, results, progress, received):
+    """Scan process body: scan the drive and hand the tree back via shared memory.
+
+    Puts ('ok', shm_name or None) or ('error', message) on results; progress
+    is a shared int array [finished, total] of top-level folders.
+    """
+    try:
+        def report(finished, total):
+            progress[0] = finished
+            progress[1] = total
+
+        tree_root = scan_drive(drive, max_depth, report)
+        if tree_root is None:
+            results.put(('ok', None))
+            return
+        shm = pack_tree(tree_root)
+        try:
+            results.put(('ok', shm.name))
+            # On Windows the block is freed with its last handle: keep ours
+            # open until the GUI has attached
+            received.wait()
+        finally:
+            shm.close()
+    except Exception as e:
+        results.put(('error', str(e)))
+
 class DiskSpaceVisualizer:
     def __init__(self, root):
         self.root = root
@@ -235,7 +645,14 @@ class DiskSpaceVisualizer:
         # Data
         self.tree_root = None
         self.view_root = None       # Current focus node for drawing (None = full tree)
-        self.rectangles = []        # List of (node, x1, y1, x2, y2) tuples
+        self._shared_tree = None    # SharedTree backing tree_root
+        self.rect_index = RectIndex()   # Spatial index of drawn rectangles
+        self.label_fits = {}        # id(node) -> full label visible on canvas
+        self._frame_draw = None     # ImageDraw for the frame being rendered (Pillow only)
+        self._frame_photo = None    # Keeps the displayed PhotoImage alive
+        self._redraw_after = None   # Pending after() id of a deferred redraw
+        self._layout = None         # Layout being built by _compute_layout
+        self._layout_cache = OrderedDict()  # (id(view), depth, w, h) -> layout
         self.context_node = None    # Node under cursor for context menu
         self.scanning = False
         self.debug_log_rewrite = False
@@ -249,6 +666,13 @@ class DiskSpaceVisualizer:
             "#DDA0DD", "#98D8C8", "#F7DC6F", "#BB8FCE", "#85C1E9",
             "#F8C471", "#82E0AA", "#F1948A", "#85C1E9", "#D7BDE2"
         ]
+        self._level_palettes = {}   # level -> self.colors shaded for that depth
+        
+        # Label fonts are built once and shared; a font tuple is re-parsed by Tk
+        # on every create_text call
+        self.label_fonts = {size: tkfont.Font(root=root, family='Segoe UI', size=size)
+                            for size in range(7, 11)}
+        self.label_line_h = self.label_fonts[7].metrics('linespace')
         
         self.setup_ui()
         
@@ -363,35 +787,75 @@ class DiskSpaceVisualizer:
         self.status_label.config(text="Scanning...")
         self.canvas.delete("all")
         
-        # Start scanning in background thread
+        # Scan in a separate process so tree building doesn't share the GIL
+        # with the UI; the result comes back through shared memory
         drive = self.drive_var.get()
-        depth = int(self.depth_var.get())
-        
-        thread = threading.Thread(target=self.scan_worker, args=(drive, depth))
-        thread.daemon = True
-        thread.start()
+        self._scan_results = multiprocessing.Queue()
+        self._scan_progress = multiprocessing.Array('i', 2)
+        self._scan_received = multiprocessing.Event()
+        self._scan_proc = multiprocessing.Process(
+            target=_scan_entrypoint,
+            args=(drive, SCAN_MAX_DEPTH, self._scan_results,
+                  self._scan_progress, self._scan_received))
+        self._scan_proc.daemon = True
+        self._scan_proc.start()
+        self.root.after(100, self._poll_scan)
     
-    def scan_worker(self, drive, depth):
+    def _poll_scan(self):
+        """Check on the scan process; reschedules itself until a result arrives."""
         try:
-            root_path = f"{drive}:\\"
-            root_vol = f"{drive}:"
-            
-            # Сканируем на полную глубину (100 уровней)
-            tree_root = build_tree(root_path, parent=None, depth=0, 
-                                 max_depth=100, root_volume_letter=root_vol)
-            
-            if tree_root:
-                tree_root.aggregate_size()
-            
-            # Update UI in main thread
-            self.root.after(0, self.scan_complete, tree_root)
-            
+            status, payload = self._scan_results.get_nowait()
+        except queue.Empty:
+            if self._scan_proc.is_alive():
+                finished, total = self._scan_progress[:]
+                if total:
+                    self.status_label.config(text=f"Scanning... {finished}/{total} folders")
+                self.root.after(100, self._poll_scan)
+                return
+            try:
+                # The process may have exited right after queueing its result
+                status, payload = self._scan_results.get(timeout=1)
+            except queue.Empty:
+                self.scan_error(f"scan process exited with code {self._scan_proc.exitcode}")
+                return
+
+        if status == 'error':
+            self.scan_error(payload)
+        elif payload is None:
+            self.scan_complete(None)
+        else:
+            self._load_scan_result(payload)
+
+    def _load_scan_result(self, shm_name):
+        """Attach to the scan process's shared memory block and show its tree.
+
+        Nodes are read from the block as folders are laid out, so this returns
+        at once.
+        """
+        try:
+            try:
+                shm = shared_memory.SharedMemory(name=shm_name)
+            finally:
+                # Attached (or failed): either way the scan process may release its handle
+                self._scan_received.set()
+            try:
+                tree = SharedTree(shm)
+            except Exception:
+                shm.close()
+                raise
         except Exception as e:
-            self.root.after(0, self.scan_error, str(e))
+            self.scan_error(str(e))
+            return
+        self.scan_complete(tree.root, tree)
     
-    def scan_complete(self, tree_root):
+    def scan_complete(self, tree_root, shared_tree=None):
+        self._layout_cache.clear()
         self.tree_root = tree_root
         self.view_root = tree_root
+        # The previous scan's block goes with its tree, also when this scan found nothing
+        if self._shared_tree is not None:
+            self._shared_tree.close()
+        self._shared_tree = shared_tree
         self.scanning = False
         self.scan_button.config(state='normal')
         self.progress.stop()
@@ -446,13 +910,14 @@ class DiskSpaceVisualizer:
 
         self._hide_tooltip()
         self.canvas.delete("all")
-        self.rectangles.clear()
+        self.rect_index.clear()
+        self.label_fits.clear()
 
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
 
         if canvas_width <= 1 or canvas_height <= 1:
-            self.root.after(100, self.draw_visualization)
+            self._schedule_redraw(100)
             return
 
         draw_depth = int(self.depth_var.get())
@@ -460,12 +925,25 @@ class DiskSpaceVisualizer:
         if should_log:
             self.debug_entries = []
         draw_error = None
+        frame = None
+        if Image is not None:
+            # Rasterize all rectangles into one image: a single canvas item
+            # instead of one per rectangle. Labels stay canvas text on top.
+            frame = Image.new('RGB', (canvas_width, canvas_height), 'white')
+            self._frame_draw = ImageDraw.Draw(frame)
         try:
-            self.draw_node_recursive(root, 0, 0, canvas_width, canvas_height, 0, draw_depth)
+            layout = self._compute_layout(root, draw_depth, canvas_width, canvas_height)
+            self._paint_layout(layout)
         except Exception as exc:
             draw_error = exc
             import traceback
             traceback.print_exc()
+        finally:
+            self._frame_draw = None
+        if frame is not None:
+            self._frame_photo = ImageTk.PhotoImage(frame)
+            image_id = self.canvas.create_image(0, 0, anchor=tk.NW, image=self._frame_photo)
+            self.canvas.tag_lower(image_id)
         if should_log:
             self._write_debug_log(canvas_width, canvas_height, draw_depth, error=draw_error)
             self.debug_log_rewrite = False
@@ -504,12 +982,18 @@ class DiskSpaceVisualizer:
         })
 
     def _draw_tracked_rectangle(self, node, x0, y0, x1, y1, level, color, outline_w=1):
-        """Draw one canvas rectangle; log exactly once when debug logging is enabled."""
-        rect_id = self.canvas.create_rectangle(
-            x0, y0, x1, y1, fill=color, outline='#333333', width=outline_w)
-        node.rect_coords = (x0, y0, x1, y1)
-        node.canvas_id = rect_id
-        self.rectangles.append((node, x0, y0, x1, y1))
+        """Draw one rectangle; log exactly once when debug logging is enabled.
+
+        Returns the canvas item id, or None when drawn into the Pillow frame.
+        """
+        if self._frame_draw is not None:
+            self._frame_draw.rectangle((x0, y0, x1, y1), fill=color,
+                                       outline='#333333', width=outline_w)
+            rect_id = None
+        else:
+            rect_id = self.canvas.create_rectangle(
+                x0, y0, x1, y1, fill=color, outline='#333333', width=outline_w)
+        self.rect_index.add(node, x0, y0, x1, y1)
         if self.debug_log_rewrite:
             self._record_debug_entry(node, x0, y0, x1, y1, level)
         return rect_id
@@ -559,12 +1043,12 @@ class DiskSpaceVisualizer:
         lines.extend([
             "-" * 120,
             f"Drawn items: {len(entries)}",
-            f"Canvas rectangles: {len(self.rectangles)}",
+            f"Canvas rectangles: {self.rect_index.count}",
         ])
-        if len(entries) != len(self.rectangles):
+        if len(entries) != self.rect_index.count:
             lines.append(
                 f"WARNING: log entries ({len(entries)}) != "
-                f"canvas rectangles ({len(self.rectangles)})"
+                f"canvas rectangles ({self.rect_index.count})"
             )
         lines.extend([
             f"Sum pixel areas (all rects, nested): {total_px} px "
@@ -599,19 +1083,21 @@ class DiskSpaceVisualizer:
     
     def node_color(self, node, level):
         """Pick a stable color per node; siblings differ, deeper levels are slightly darker."""
-        palette = self.colors
+        palette = self._level_palettes.get(level)
+        if palette is None:
+            if level > 1:
+                factor = 0.92 ** (level - 1)
+                palette = tuple(self._shade_color(c, factor) for c in self.colors)
+            else:
+                palette = tuple(self.colors)
+            self._level_palettes[level] = palette
         if node.parent and node.parent.children:
-            siblings = [ch for ch in node.parent.children if ch.size > 0]
             try:
-                idx = siblings.index(node)
+                idx = node.parent.children.index(node)
             except ValueError:
                 idx = 0
-            base = palette[idx % len(palette)]
-        else:
-            base = palette[level % len(palette)]
-        if level > 1:
-            return self._shade_color(base, 0.92 ** (level - 1))
-        return base
+            return palette[idx % len(palette)]
+        return palette[level % len(palette)]
     
     @staticmethod
     def _shade_color(hex_color, factor):
@@ -624,50 +1110,69 @@ class DiskSpaceVisualizer:
         b = min(255, int(b * factor))
         return f'#{r:02x}{g:02x}{b:02x}'
     
-    def draw_node_recursive(self, node, x, y, width, height, level, max_draw_depth):
+    def layout_node(self, node, x, y, width, height, level, max_draw_depth):
+        """Record node's rectangle in self._layout, then lay out its children inside."""
         w = int(round(width))
         h = int(round(height))
-        if not node or w < 1 or h < 1:
+        if not node or w < MIN_RECT_SIDE or h < MIN_RECT_SIDE:
             return
 
         x0 = int(round(x))
         y0 = int(round(y))
-        x1 = x0 + w
-        y1 = y0 + h
-
-        color = self.node_color(node, level)
-        if getattr(node, 'is_other', False):
-            color = '#BDC3C7'
-        outline_w = 2 if level == 0 else 1
-
-        self._draw_tracked_rectangle(node, x0, y0, x1, y1, level, color, outline_w)
-
-        if getattr(node, 'is_other', False):
-            self._draw_other_label(node, x0, y0, w, h)
-        else:
-            self._draw_node_label(node, x0, y0, w, h)
-
-        if getattr(node, 'is_other', False):
-            return
-
-        if node.is_dir and node.children and level < max_draw_depth:
-            children = [ch for ch in node.children if ch.size > 0]
-            if not children:
-                return
-            inset = 1 if level > 0 else 0
-            inner_w = w - 2 * inset
-            inner_h = h - 2 * inset
-            if inner_w < 1 or inner_h < 1:
-                return
-            self.draw_treemap(children, x0 + inset, y0 + inset,
-                              inner_w, inner_h, level + 1, max_draw_depth)
+        inset = 1 if level > 0 else 0
+        inner_w = w - 2 * inset
+        inner_h = h - 2 * inset
+        covered = (not node.is_other and node.is_dir and bool(node.children)
+                   and level < max_draw_depth and inner_w >= 1 and inner_h >= 1)
+        self._layout.append((node, x0, y0, x0 + w, y0 + h, level, covered))
+        if covered:
+            self.layout_treemap(node.children, x0 + inset, y0 + inset,
+                                inner_w, inner_h, level + 1, max_draw_depth)
+
+    def _compute_layout(self, root, depth, width, height):
+        """Treemap rectangles in draw order: (node, x1, y1, x2, y2, level, covered).
+
+        covered means the node's children are drawn over its interior.
+        Results are memoized per (view root, depth, size) in an LRU cache.
+        """
+        key = (id(root), depth, width, height)
+        layout = self._layout_cache.get(key)
+        if layout is not None:
+            self._layout_cache.move_to_end(key)
+            return layout
+        self._layout = []
+        try:
+            self.layout_node(root, 0, 0, width, height, 0, depth)
+            layout = self._layout
+        finally:
+            self._layout = None
+        self._layout_cache[key] = layout
+        if len(self._layout_cache) > LAYOUT_CACHE_SIZE:
+            self._layout_cache.popitem(last=False)
+        return layout
+
+    def _paint_layout(self, layout):
+        for node, x0, y0, x1, y1, level, covered in layout:
+            if node.is_other:
+                color = '#BDC3C7'
+            else:
+                color = self.node_color(node, level)
+            outline_w = 2 if level == 0 else 1
+            self._draw_tracked_rectangle(node, x0, y0, x1, y1, level, color, outline_w)
+            # Children hide the interior, so a label there would never be seen
+            if covered:
+                continue
+            if node.is_other:
+                self._draw_other_label(node, x0, y0, x1 - x0, y1 - y0)
+            else:
+                self._draw_node_label(node, x0, y0, x1 - x0, y1 - y0)
 
-    @staticmethod
-    def _label_display_mode(width, height):
+    def _label_display_mode(self, width, height):
         """How much of the label fits: none, partial, or full two-line text."""
-        if width < 28 or height < 14:
+        line_h = self.label_line_h
+        if width < 28 or height < max(14, line_h):
             return 'none'
-        if width < MIN_LABEL_WIDTH or height < MIN_LABEL_HEIGHT:
+        if width < MIN_LABEL_WIDTH or height < max(MIN_LABEL_HEIGHT, 2 * line_h):
             return 'partial'
         return 'full'
 
@@ -687,7 +1192,7 @@ class DiskSpaceVisualizer:
 
     def _draw_node_label(self, node, x, y, width, height):
         mode = self._label_display_mode(width, height)
-        node.label_fits = (mode == 'full')
+        self.label_fits[id(node)] = (mode == 'full')
         if mode == 'none':
             return
 
@@ -703,12 +1208,12 @@ class DiskSpaceVisualizer:
 
         pad = 3
         self.canvas.create_text(x + width // 2, y + height // 2, text=text,
-                                anchor=tk.CENTER, font=('Segoe UI', font_size),
+                                anchor=tk.CENTER, font=self.label_fonts[font_size],
                                 fill='#1a1a2e', width=max(1, width - 2 * pad))
 
     def _draw_other_label(self, node, x, y, width, height):
         mode = self._label_display_mode(width, height)
-        node.label_fits = (mode == 'full')
+        self.label_fits[id(node)] = (mode == 'full')
         if mode == 'none':
             return
         dirs = getattr(node, 'other_dir_count', 0)
@@ -728,7 +1233,7 @@ class DiskSpaceVisualizer:
             font_size = min(10, max(7, int(min(width, height) / 12)))
         pad = 3
         self.canvas.create_text(x + width // 2, y + height // 2, text=text,
-                                anchor=tk.CENTER, font=('Segoe UI', font_size),
+                                anchor=tk.CENTER, font=self.label_fonts[font_size],
                                 fill='#1a1a2e', width=max(1, width - 2 * pad))
     
     @staticmethod
@@ -806,58 +1311,65 @@ class DiskSpaceVisualizer:
         return ref * (OTHER_SIZE_PCT / 100.0)
 
     def _make_other_node(self, children):
-        node = Node(name='Other', is_dir=True)
-        node.is_synthetic = True
-        node.is_other = True
-        node.grouped_children = list(children)
-        node.size = sum(ch.size for ch in children)
-        node.other_dir_count = sum(1 for ch in children if ch.is_dir)
-        node.other_file_count = sum(1 for ch in children if not ch.is_dir)
-        return node
+        return OtherNode(children)
+
+    def _group_small_entries(self, nodes, total_size, area=0, parent_share=False):
+        """Merge tiny siblings into one Other tile.
 
-    def _group_small_entries(self, nodes, total_size):
-        """Merge siblings each below OTHER_SIZE_PCT of view root into one Other tile."""
+        Tiny = at most OTHER_SIZE_PCT of view root, or projected onto fewer than
+        MIN_RECT_AREA pixels of the given area. With parent_share (nodes is a
+        folder's full child list), also below OTHER_PARENT_PCT of the folder or
+        in the tail after (100 - OTHER_PARENT_PCT)% of it.
+        """
         if not nodes or total_size <= 0:
             return nodes
-        threshold = self._other_threshold_bytes(total_size)
+        view_threshold = self._other_threshold_bytes(total_size)
+        area_threshold = total_size * MIN_RECT_AREA / area if area > 0 else 0
+        share_threshold = total_size * (OTHER_PARENT_PCT / 100.0) if parent_share else 0
+        tail_start = total_size - share_threshold
         kept = []
         other_list = []
+        prev_other = None
+        cumulative = 0
         for node in nodes:
-            if self._is_synthetic(node):
+            if node.is_other:
+                prev_other = node
+            elif self._is_synthetic(node):
                 kept.append(node)
-            elif node.size <= threshold:
+            elif (node.size <= view_threshold or node.size < area_threshold
+                  or node.size < share_threshold or cumulative >= tail_start):
                 other_list.append(node)
             else:
                 kept.append(node)
+            cumulative += node.size
         if not other_list:
             return nodes
+        if prev_other is not None:
+            # Fold into the Other tile from an earlier pass rather than adding a second
+            other_list = prev_other.grouped_children + other_list
         kept.append(self._make_other_node(other_list))
         kept.sort(key=lambda n: n.size, reverse=True)
         return kept
 
-    def _prepare_treemap_nodes(self, nodes, width, height):
-        nodes = [n for n in nodes if n.size > 0]
+    def _prepare_treemap_nodes(self, nodes, width, height, parent_share=False):
+        """Group tiny entries; nodes arrive non-empty and sorted (Node.aggregate_size)."""
         if not nodes:
             return nodes
-        nodes.sort(key=lambda n: n.size, reverse=True)
         total_size = sum(n.size for n in nodes)
-        nodes = self._group_small_entries(nodes, total_size)
-        nodes.sort(key=lambda n: n.size, reverse=True)
-        return nodes
+        return self._group_small_entries(nodes, total_size, width * height, parent_share)
 
-    def draw_treemap(self, nodes, x, y, width, height, level, max_draw_depth):
+    def layout_treemap(self, nodes, x, y, width, height, level, max_draw_depth):
         w = int(round(width))
         h = int(round(height))
         if w < 1 or h < 1:
             return
-        nodes = self._prepare_treemap_nodes(nodes, w, h)
+        # Share-of-parent grouping only here, on the full sibling list: squarify
+        # re-prepares shrinking subsets, where it would keep eating the tail
+        nodes = self._prepare_treemap_nodes(nodes, w, h, parent_share=True)
         if not nodes:
             return
-        total_size = sum(n.size for n in nodes)
-        if total_size == 0:
-            return
         if len(nodes) == 1:
-            self.draw_node_recursive(nodes[0], x, y, w, h, level, max_draw_depth)
+            self.layout_node(nodes[0], x, y, w, h, level, max_draw_depth)
             return
         if w < 2 or h < 2:
             self._layout_slice(nodes, x, y, w, h, level, max_draw_depth)
@@ -876,7 +1388,7 @@ class DiskSpaceVisualizer:
         if not nodes:
             return
         if len(nodes) == 1:
-            self.draw_node_recursive(nodes[0], x0, y0, w, h, level, max_draw_depth)
+            self.layout_node(nodes[0], x0, y0, w, h, level, max_draw_depth)
             return
 
         sizes = [n.size for n in nodes]
@@ -885,25 +1397,16 @@ class DiskSpaceVisualizer:
             cx = x0
             for n, nw in zip(nodes, widths):
                 if nw > 0:
-                    self.draw_node_recursive(n, cx, y0, nw, h, level, max_draw_depth)
+                    self.layout_node(n, cx, y0, nw, h, level, max_draw_depth)
                 cx += nw
         else:
             heights = self._partition_pixels(h, sizes)
             cy = y0
             for n, nh in zip(nodes, heights):
                 if nh > 0:
-                    self.draw_node_recursive(n, x0, cy, w, nh, level, max_draw_depth)
+                    self.layout_node(n, x0, cy, w, nh, level, max_draw_depth)
                 cy += nh
 
-    def _worst_ratio(self, row, side_length):
-        if not row or side_length <= 0:
-            return float('inf')
-        s = sum(n.size for n in row)
-        r_max = max(n.size for n in row)
-        r_min = min(n.size for n in row)
-        side_sq = side_length * side_length
-        return max(side_sq * r_max / (s * s), (s * s) / (side_sq * r_min))
-
     def _squarify_iter(self, nodes, x, y, width, height, level, max_draw_depth):
         """Iterative squarified treemap (no Python recursion between rows)."""
         stack = [(nodes, int(round(x)), int(round(y)),
@@ -916,39 +1419,39 @@ class DiskSpaceVisualizer:
             if not nodes:
                 continue
             if len(nodes) == 1:
-                self.draw_node_recursive(nodes[0], x0, y0, w_tot, h_tot, level, max_draw_depth)
+                self.layout_node(nodes[0], x0, y0, w_tot, h_tot, level, max_draw_depth)
                 continue
             if w_tot < 2 or h_tot < 2:
                 self._layout_slice(nodes, x0, y0, w_tot, h_tot, level, max_draw_depth)
                 continue
 
             total_size = sum(n.size for n in nodes)
-            row = []
-            remaining = list(nodes)
-            laid_out = False
-
-            while remaining:
-                node = remaining[0]
-                candidate = row + [node]
-                side = min(w_tot, h_tot)
-                if (not row or
-                        self._worst_ratio(candidate, side) <= self._worst_ratio(row, side)):
-                    row.append(remaining.pop(0))
-                else:
-                    followups = self._place_row(
-                        row, remaining, x0, y0, w_tot, h_tot, total_size, level, max_draw_depth)
-                    stack.extend(followups)
-                    laid_out = True
+            # Grow the row while its worst aspect ratio improves. Nodes are sorted
+            # by size desc, so the row max is nodes[0] and the row min is the newest.
+            side = min(w_tot, h_tot)
+            side_sq = side * side
+            largest = nodes[0].size
+            row_sum = 0
+            worst = float('inf')
+            count = 0
+            for node in nodes:
+                s = row_sum + node.size
+                s_sq = s * s
+                ratio = max(side_sq * largest / s_sq, s_sq / (side_sq * node.size))
+                if count and ratio > worst:
                     break
+                worst = ratio
+                row_sum = s
+                count += 1
 
-            if not laid_out and row:
-                followups = self._place_row(
-                    row, remaining, x0, y0, w_tot, h_tot, total_size, level, max_draw_depth)
-                stack.extend(followups)
+            followups = self._place_row(
+                nodes[:count], nodes[count:], x0, y0, w_tot, h_tot, total_size,
+                level, max_draw_depth)
+            stack.extend(followups)
 
     def _place_row(self, row, remaining, x0, y0, w_tot, h_tot, total_size,
                    level, max_draw_depth):
-        """Draw one squarify row; return stack tasks for the remaining region."""
+        """Lay out one squarify row; return stack tasks for the remaining region."""
         row_sum = sum(n.size for n in row)
         if row_sum == 0:
             if remaining:
@@ -975,7 +1478,7 @@ class DiskSpaceVisualizer:
             cur_y = y0
             for n, rh in zip(row, self._partition_pixels(h_tot, row_sizes, min_unit=True)):
                 if rh > 0 and strip_w > 0:
-                    self.draw_node_recursive(n, x0, cur_y, strip_w, rh, level, max_draw_depth)
+                    self.layout_node(n, x0, cur_y, strip_w, rh, level, max_draw_depth)
                 cur_y += rh
 
             if remaining and rest_w > 0:
@@ -993,7 +1496,7 @@ class DiskSpaceVisualizer:
             cur_x = x0
             for n, rw in zip(row, self._partition_pixels(w_tot, row_sizes, min_unit=True)):
                 if rw > 0 and strip_h > 0:
-                    self.draw_node_recursive(n, cur_x, y0, rw, strip_h, level, max_draw_depth)
+                    self.layout_node(n, cur_x, y0, rw, strip_h, level, max_draw_depth)
                 cur_x += rw
 
             if remaining and rest_h > 0:
@@ -1002,10 +1505,7 @@ class DiskSpaceVisualizer:
         return tasks
     
     def _node_at(self, x, y):
-        for node, x1, y1, x2, y2 in reversed(self.rectangles):
-            if x1 <= x <= x2 and y1 <= y <= y2:
-                return node
-        return None
+        return self.rect_index.find(x, y)
 
     def _hide_tooltip(self):
         self._tooltip_node = None
@@ -1062,7 +1562,7 @@ class DiskSpaceVisualizer:
 
     def on_canvas_motion(self, event):
         node = self._node_at(event.x, event.y)
-        if node is None or getattr(node, 'label_fits', True):
+        if node is None or self.label_fits.get(id(node), True):
             self._hide_tooltip()
             return
         self._tooltip_node = node
@@ -1100,24 +1600,27 @@ class DiskSpaceVisualizer:
     
     def on_canvas_resize(self, event=None):
         if self.tree_root:
-            # Redraw after a short delay to avoid too frequent redraws during resize
-            self.root.after(100, self.draw_visualization)
+            # Tk fires <Configure> continuously while dragging; redraw once it settles
+            self._schedule_redraw(150)
+
+    def _schedule_redraw(self, delay_ms):
+        """Run draw_visualization after delay_ms, replacing any redraw still pending."""
+        if self._redraw_after is not None:
+            self.root.after_cancel(self._redraw_after)
+        self._redraw_after = self.root.after(delay_ms, self._do_redraw)
+
+    def _do_redraw(self):
+        self._redraw_after = None
+        self.draw_visualization()
     
     @staticmethod
     def format_size(size_bytes):
         """Format bytes as human readable string"""
-        if size_bytes == 0:
+        if size_bytes <= 0:
             return "0 B"
-        
-        units = ['B', 'KB', 'MB', 'GB', 'TB']
-        unit_index = 0
-        size = float(size_bytes)
-        
-        while size >= 1024 and unit_index < len(units) - 1:
-            size /= 1024
-            unit_index += 1
-        
-        return f"{size:.1f} {units[unit_index]}"
+        # Unit index straight from the bit length: each unit is 2**10 larger
+        idx = min((size_bytes.bit_length() - 1) // 10, len(SIZE_UNITS) - 1)
+        return f"{size_bytes / (1 << (10 * idx)):.1f} {SIZE_UNITS[idx]}"
 
 def main():
     root = tk.Tk()
@@ -1125,4 +1628,5 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file